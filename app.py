@@ -1,11 +1,21 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, send_from_directory
+from flask import Flask, Response, abort, g, make_response, render_template, request, jsonify, redirect, url_for, send_from_directory
 from flask_login import LoginManager, login_user, logout_user, current_user, login_required
-from models import db, User, DataProduct, ColumnOption
-from config import Config, SENSITIVE_COLUMNS
-from datetime import datetime
+from models import db, User, DataProduct, ColumnOption, RelatedProduct, ensure_schema, get_catalog_version, bump_catalog_version, CatalogVersion, ProductFacet
+from config import Config, SENSITIVE_COLUMNS, COMPACT_KEYS
+from suggest import PrefixIndex, WHOLE_VALUE_FIELDS, TOKEN_FIELDS, SPLIT_FIELDS
+from related import SimilarityEngine
+from compression import ResponseCache, negotiate_encoding, compress, dump_json, compact_rows
+from ratelimit import TokenBucketStore, AdmissionGate, COST_CLASSES, ENDPOINT_COSTS
+from datetime import datetime, date, timedelta
 import os
 import re
+import threading
+from contextlib import contextmanager
 from werkzeug.utils import secure_filename
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, startup is not serialized
+    fcntl = None
 
 DATE_FIELDS = ['prod_date', 'trial_date', 'created_date', 'end_date', 'pit_date', 
                'history_start', 'contract_start', 'contract_end']
@@ -67,13 +77,202 @@ db.init_app(app)
 login_manager = LoginManager()
 login_manager.init_app(app)
 
+# Typeahead index, built lazily and rebuilt whenever another worker has
+# changed the catalog since this process last saw it
+suggest_index = PrefixIndex()
+
+def get_suggest_index():
+    """Return the prefix index, rebuilding it if the catalog version moved on"""
+    suggest_index.sync(get_catalog_version(),
+                       lambda: (DataProduct.query.all(), ColumnOption.query.all()))
+    return suggest_index
+
+def update_suggest_index(version, update):
+    """Apply an incremental update for the write that produced `version`.
+
+    The version check and the update run under the index lock, so a lookup
+    in another thread can't rebuild in between and have the delta applied twice.
+    """
+    suggest_index.apply(version, update)
+
+# Related-datasets engine; neighbor lists are persisted in related_products.
+# The engine records the catalog version its vectors reflect, and only
+# refreshes incrementally when no other worker has written in between.
+# related_lock covers every engine mutation together with saving its results.
+related_engine = SimilarityEngine()
+related_lock = threading.RLock()
+
+def save_related(product_ids):
+    """Persist the engine's neighbor lists for the given products"""
+    product_ids = list(product_ids)
+    if product_ids:
+        RelatedProduct.query.filter(RelatedProduct.product_id.in_(product_ids)).delete(synchronize_session=False)
+    for pid in product_ids:
+        for rank, (related_id, score) in enumerate(related_engine.neighbors.get(pid, [])):
+            db.session.add(RelatedProduct(product_id=pid, related_id=related_id, rank=rank, score=score))
+    db.session.commit()
+
+def rebuild_related():
+    """Recompute every neighbor list from the database and mark the table as built"""
+    with related_lock:
+        version = get_catalog_version()
+        RelatedProduct.query.delete()
+        related_engine.rebuild(DataProduct.query.all())
+        save_related(related_engine.ids)
+        db.session.execute(db.update(CatalogVersion).where(CatalogVersion.id == 1)
+                           .values(related_version=version))
+        db.session.commit()
+        related_engine.version = version
+
+def refresh_related(version, product=None, removed_id=None):
+    """Bring related datasets up to date after the write that produced `version`.
+
+    Refreshes incrementally when the engine was current just before this
+    write, otherwise rebuilds so stale vectors never overwrite shared rows.
+    Also rebuilds when the product brings terms or facets the engine's
+    vocabularies don't contain. Writes that don't touch product vectors only
+    advance the engine's version.
+    """
+    with related_lock:
+        try:
+            current = related_engine.version is not None and related_engine.version == version - 1
+            if product is None and removed_id is None:
+                if current:
+                    related_engine.version = version
+            elif not current or (product is not None and not related_engine.covers(product)):
+                rebuild_related()
+            else:
+                if removed_id is not None:
+                    save_related(related_engine.remove(removed_id))
+                else:
+                    save_related(related_engine.refresh(product))
+                related_engine.version = version
+        except Exception as e:
+            db.session.rollback()
+            # Log error but don't fail the request; the next rebuild catches up
+            print(f"Error refreshing related datasets: {e}")
+            related_engine.version = None
+
+def get_related(product_id):
+    """Return (product, score) pairs related to a product, best first"""
+    related_version = db.session.query(CatalogVersion.related_version).filter_by(id=1).scalar()
+    if related_version is None:
+        try:
+            rebuild_related()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error building related datasets: {e}")
+    rows = (db.session.query(DataProduct, RelatedProduct.score)
+            .join(RelatedProduct, RelatedProduct.related_id == DataProduct.id)
+            .filter(RelatedProduct.product_id == product_id)
+            .order_by(RelatedProduct.rank)
+            .all())
+    return rows
+
+# Serialized/compressed bodies of catalog-wide JSON responses
+response_cache = ResponseCache()
+# Rendered dataset detail pages, keyed by product id, updated_at and role
+page_cache = ResponseCache(max_entries=256)
+
+def cached_json_response(name, projection, build_payload):
+    """Serve a JSON payload that depends only on the catalog version and projection.
+
+    The serialized body and each compressed variant are cached under
+    (name, catalog version, projection[, encoding]).
+    """
+    version = get_catalog_version()
+    key = (name, version, projection)
+    body = response_cache.get_or_create(key, lambda: dump_json(build_payload()))
+    encoding = None
+    if len(body) >= app.config['COMPRESS_MIN_SIZE']:
+        encoding = negotiate_encoding(request.headers.get('Accept-Encoding'))
+    if encoding:
+        body = response_cache.get_or_create(key + (encoding,), lambda: compress(body, encoding))
+    response = Response(body, mimetype='application/json')
+    response.vary.add('Accept-Encoding')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.set_etag(f'{name}-{version}-{"-".join(map(str, projection))}-{encoding or "identity"}')
+    return response.make_conditional(request)
+
+# Admission control for expensive endpoints; buckets share one local store
+ratelimit_storage = app.config['RATELIMIT_STORAGE'] or os.path.join(app.instance_path, 'ratelimit.db')
+rate_limiters = {
+    'api': TokenBucketStore(ratelimit_storage,
+                            capacity=app.config['RATELIMIT_CAPACITY'],
+                            refill_rate=app.config['RATELIMIT_REFILL_PER_SEC']),
+    'typeahead': TokenBucketStore(ratelimit_storage,
+                                  capacity=app.config['RATELIMIT_TYPEAHEAD_CAPACITY'],
+                                  refill_rate=app.config['RATELIMIT_TYPEAHEAD_REFILL_PER_SEC']),
+}
+heavy_gate = AdmissionGate(app.config['HEAVY_CONCURRENCY'], app.config['HEAVY_WORKER_CONCURRENCY'])
+
+def too_many_requests(retry_after, error):
+    """429 with Retry-After; JSON for API calls, plain text for pages"""
+    if request.path.startswith('/api/'):
+        response = jsonify({'error': error})
+    else:
+        response = make_response(f'{error}. Please retry in {retry_after} seconds.')
+        response.mimetype = 'text/plain'
+    response.status_code = 429
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+@app.before_request
+def admit_request():
+    """Shed load early with 429 when a client is over budget or already busy"""
+    cost_class = ENDPOINT_COSTS.get(request.endpoint)
+    if not cost_class or not app.config['RATELIMIT_ENABLED']:
+        return None
+    
+    if current_user.is_authenticated:
+        client = f'user:{current_user.id}'
+    else:
+        client = f'ip:{request.remote_addr}'
+    # Check the gate first so a busy worker doesn't also charge the client;
+    # release_admission frees the slot if the bucket then says no
+    if cost_class == 'heavy':
+        if not heavy_gate.try_enter(client):
+            return too_many_requests(1, 'Too many concurrent requests')
+        g.heavy_client = client
+    
+    cost, bucket = COST_CLASSES[cost_class]
+    allowed, retry_after = rate_limiters[bucket].take(f'{bucket}:{client}', cost)
+    if not allowed:
+        return too_many_requests(retry_after, 'Rate limit exceeded')
+    return None
+
+@app.teardown_request
+def release_admission(exc):
+    client = g.pop('heavy_client', None)
+    if client is not None:
+        heavy_gate.leave(client)
+
 @login_manager.user_loader
 def load_user(user_id):
     return User.query.get(int(user_id))
 
+@contextmanager
+def startup_lock():
+    """Serialize schema setup across worker processes starting at the same time.
+
+    gunicorn imports the app once per worker, so without this two workers can
+    race on CREATE TABLE / ALTER TABLE against the same database.
+    """
+    os.makedirs(app.instance_path, exist_ok=True)
+    with open(os.path.join(app.instance_path, '.startup.lock'), 'w') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
 # Create tables and default users (only in development)
-with app.app_context():
+with app.app_context(), startup_lock():
     db.create_all()
+    ensure_schema()
     # Ensure uploads directory exists
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
     # Only create default users if explicitly enabled via environment variable
@@ -127,9 +326,17 @@ def get_user():
 
 @app.route('/api/products')
 def get_products():
-    products = DataProduct.query.all()
     is_admin = current_user.is_authenticated and current_user.role == 'admin'
-    return jsonify([p.to_dict(include_sensitive=is_admin) for p in products])
+    compact = request.args.get('compact', '').lower() in ['1', 'true']
+    
+    def build_payload():
+        rows = [p.to_dict(include_sensitive=is_admin) for p in DataProduct.query.all()]
+        if compact:
+            # Omit nulls and shorten keys; 'keys' maps short keys back to column names
+            return {'keys': {v: k for k, v in COMPACT_KEYS.items()}, 'items': compact_rows(rows, COMPACT_KEYS)}
+        return rows
+    
+    return cached_json_response('products', (is_admin, compact), build_payload)
 
 @app.route('/api/products/<int:id>')
 def get_product(id):
@@ -137,6 +344,20 @@ def get_product(id):
     is_admin = current_user.is_authenticated and current_user.role == 'admin'
     return jsonify(product.to_dict(include_sensitive=is_admin))
 
+@app.route('/api/products/<int:id>/related')
+def get_related_products(id):
+    """Datasets most similar to a product by description and facets"""
+    DataProduct.query.get_or_404(id)
+    return jsonify([{
+        'id': p.id,
+        'data_ID': p.data_ID,
+        'short_desc': p.short_desc,
+        'vendor': p.vendor,
+        'datatype': p.datatype,
+        'region': p.region,
+        'score': round(score, 4)
+    } for p, score in get_related(id)])
+
 @app.route('/api/products', methods=['POST'])
 @login_required
 def create_product():
@@ -148,18 +369,23 @@ def create_product():
     
     product = DataProduct()
     for key, value in data.items():
-        if hasattr(product, key) and key != 'id':
+        if hasattr(product, key) and key not in ['id', 'updated_at']:
             # Sanitize string values
             if isinstance(value, str):
                 # Get max length from model if available
                 column = getattr(product.__table__.columns, key, None)
-                max_length = column.type.length if column and hasattr(column.type, 'length') else None
+                max_length = column.type.length if column is not None and hasattr(column.type, 'length') else None
                 value = sanitize_string(value, max_length)
             setattr(product, key, parse_value(key, value))
+    product.normalize_costs()
+    product.normalize_facets()
     
     try:
         db.session.add(product)
+        version = bump_catalog_version()
         db.session.commit()
+        update_suggest_index(version, lambda index: index.update_terms({}, PrefixIndex.product_terms(product)))
+        refresh_related(version, product)
         return jsonify(product.to_dict(include_sensitive=True)), 201
     except Exception as e:
         db.session.rollback()
@@ -175,18 +401,29 @@ def update_product(id):
     if not data:
         return jsonify({'error': 'Invalid request'}), 400
     
+    old_terms = PrefixIndex.product_terms(product)
+    old_signature = SimilarityEngine.signature(product)
     for key, value in data.items():
-        if hasattr(product, key) and key != 'id':
+        if hasattr(product, key) and key not in ['id', 'updated_at']:
             # Sanitize string values
             if isinstance(value, str):
                 # Get max length from model if available
                 column = getattr(product.__table__.columns, key, None)
-                max_length = column.type.length if column and hasattr(column.type, 'length') else None
+                max_length = column.type.length if column is not None and hasattr(column.type, 'length') else None
                 value = sanitize_string(value, max_length)
             setattr(product, key, parse_value(key, value))
+    product.normalize_costs()
+    product.normalize_facets()
     
     try:
+        version = bump_catalog_version()
         db.session.commit()
+        update_suggest_index(version, lambda index: index.update_terms(old_terms, PrefixIndex.product_terms(product)))
+        invalidate_detail_page(id)
+        if SimilarityEngine.signature(product) != old_signature:
+            refresh_related(version, product)
+        else:
+            refresh_related(version)
         return jsonify(product.to_dict(include_sensitive=True))
     except Exception as e:
         db.session.rollback()
@@ -199,8 +436,16 @@ def delete_product(id):
         return jsonify({'error': 'Admin access required'}), 403
     try:
         product = DataProduct.query.get_or_404(id)
+        old_terms = PrefixIndex.product_terms(product)
+        # Both directions reference the product through foreign keys
+        RelatedProduct.query.filter(db.or_(RelatedProduct.product_id == id,
+                                           RelatedProduct.related_id == id)).delete(synchronize_session=False)
         db.session.delete(product)
+        version = bump_catalog_version()
         db.session.commit()
+        update_suggest_index(version, lambda index: index.update_terms(old_terms, {}))
+        invalidate_detail_page(id)
+        refresh_related(version, removed_id=id)
         return jsonify({'success': True})
     except Exception as e:
         db.session.rollback()
@@ -312,7 +557,10 @@ def create_column_option():
             is_multi_value=is_multi_value
         )
         db.session.add(option)
+        version = bump_catalog_version()
         db.session.commit()
+        update_suggest_index(version, lambda index: index.add_option(option.column_name, option.value))
+        refresh_related(version)
         return jsonify(option.to_dict()), 201
     except Exception as e:
         db.session.rollback()
@@ -324,8 +572,12 @@ def delete_column_option(id):
     if current_user.role != 'admin':
         return jsonify({'error': 'Admin access required'}), 403
     option = ColumnOption.query.get_or_404(id)
+    column_name, value = option.column_name, option.value
     db.session.delete(option)
+    version = bump_catalog_version()
     db.session.commit()
+    update_suggest_index(version, lambda index: index.remove_option(column_name, value))
+    refresh_related(version)
     return jsonify({'success': True})
 
 @app.route('/api/column-options/delete', methods=['POST'])
@@ -350,18 +602,59 @@ def delete_column_option_by_value():
         ).first()
         if option:
             db.session.delete(option)
+            version = bump_catalog_version()
             db.session.commit()
+            update_suggest_index(version, lambda index: index.remove_option(column_name, value))
+            refresh_related(version)
         return jsonify({'success': True})
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Failed to delete column option'}), 500
 
+@app.route('/api/suggest')
+def suggest():
+    """Typeahead suggestions for a field, most frequent first"""
+    field = request.args.get('field', '').strip()
+    prefix = request.args.get('prefix', '').strip()
+    try:
+        limit = min(max(int(request.args.get('limit', 10)), 1), 50)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    
+    index = get_suggest_index()
+    if field not in WHOLE_VALUE_FIELDS + TOKEN_FIELDS + SPLIT_FIELDS and not index.has_field(field):
+        return jsonify({'error': f'Unknown suggest field: {field}'}), 400
+    
+    return jsonify({
+        'field': field,
+        'prefix': prefix,
+        'suggestions': [{'value': v, 'count': c} for v, c in index.suggest(field, prefix, limit)]
+    })
+
 @app.route('/dataset/<int:id>')
 def dataset_detail(id):
-    """Render the dataset detail page"""
-    product = DataProduct.query.get_or_404(id)
+    """Render the dataset detail page, cached per product version and role"""
+    updated_at = db.session.query(DataProduct.updated_at).filter_by(id=id).first()
+    if updated_at is None:
+        abort(404)
+    updated_at = updated_at[0]
     is_admin = current_user.is_authenticated and current_user.role == 'admin'
     
+    key = ('dataset_detail', id, updated_at, is_admin)
+    html = page_cache.get_or_create(key, lambda: render_dataset_detail(id, is_admin))
+    response = make_response(html)
+    if updated_at:
+        response.last_modified = updated_at
+    stamp = updated_at.isoformat() if updated_at else 'none'
+    response.set_etag(f'dataset-{id}-{stamp}-{"admin" if is_admin else "user"}')
+    # Revalidate every time: the role comes from the session cookie
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.vary.add('Cookie')
+    return response.make_conditional(request)
+
+def render_dataset_detail(id, is_admin):
+    product = DataProduct.query.get_or_404(id)
+    
     # Parse linked_docs string into a list
     linked_docs = []
     if product.linked_docs:
@@ -378,6 +671,10 @@ def dataset_detail(id):
                          linked_docs=linked_docs,
                          is_admin=is_admin)
 
+def invalidate_detail_page(id):
+    """Evict cached detail pages for a product (all roles and versions)"""
+    page_cache.invalidate(lambda key: key[1] == id)
+
 def allowed_file(filename):
     """Check if file extension is allowed"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in Config.ALLOWED_EXTENSIONS
@@ -419,7 +716,12 @@ def upload_document(id):
         else:
             product.linked_docs = file_url
         
+        version = bump_catalog_version()
         db.session.commit()
+        # linked_docs are not indexed; just keep the index's version current
+        update_suggest_index(version, lambda index: None)
+        refresh_related(version)
+        invalidate_detail_page(id)
         
         return jsonify({
             'success': True,
@@ -463,7 +765,12 @@ def delete_document(id):
                     # Log error but don't fail the request
                     print(f"Error deleting file {filepath}: {e}")
         
+        version = bump_catalog_version()
         db.session.commit()
+        # linked_docs are not indexed; just keep the index's version current
+        update_suggest_index(version, lambda index: None)
+        refresh_related(version)
+        invalidate_detail_page(id)
         return jsonify({'success': True})
     else:
         return jsonify({'error': 'No documents found'}), 404
@@ -476,6 +783,10 @@ def uploaded_file(filename):
 @app.route('/api/filters')
 def get_filters():
     """Get unique values for filter dropdowns"""
+    return cached_json_response('filters', (), build_filters)
+
+def build_filters():
+    """Collect the filter values from all products"""
     products = DataProduct.query.all()
     
     def extract_values(field_value):
@@ -520,7 +831,76 @@ def get_filters():
         'stages': sorted(stages),
         'asset_classes': sorted(asset_classes),
     }
-    return jsonify(filters)
+    return filters
+
+@app.route('/api/analytics')
+@login_required
+def get_analytics():
+    """Spend rollups and upcoming contract renewals (admin only).
+
+    Vendor groups use the stored value. Datatype and region are multi-value,
+    so they group on product_facets and a product counts toward each of its
+    values; those buckets can sum to more than the total spend.
+    """
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Admin access required'}), 403
+    try:
+        days = min(max(int(request.args.get('days', 90)), 0), 3650)
+    except ValueError:
+        return jsonify({'error': 'days must be an integer'}), 400
+    
+    total = db.func.sum(DataProduct.annual_cost_amount)
+    count = db.func.count(DataProduct.id)
+    
+    def spend_by(column, key):
+        """GROUP BY a column and currency over products with a parsed annual cost"""
+        rows = (db.session.query(column, DataProduct.annual_cost_currency, total, count)
+                .filter(DataProduct.annual_cost_amount.isnot(None))
+                .group_by(column, DataProduct.annual_cost_currency)
+                .order_by(total.desc())
+                .all())
+        return [{key: value, 'currency': currency, 'total': amount, 'count': n}
+                for value, currency, amount, n in rows]
+    
+    def spend_by_facet(field, key):
+        """GROUP BY the split values of a multi-value facet column and currency"""
+        rows = (db.session.query(ProductFacet.value, DataProduct.annual_cost_currency, total, count)
+                .join(DataProduct, ProductFacet.product_id == DataProduct.id)
+                .filter(ProductFacet.field == field, DataProduct.annual_cost_amount.isnot(None))
+                .group_by(ProductFacet.value, DataProduct.annual_cost_currency)
+                .order_by(total.desc())
+                .all())
+        return [{key: value, 'currency': currency, 'total': amount, 'count': n}
+                for value, currency, amount, n in rows]
+    
+    totals = (db.session.query(DataProduct.annual_cost_currency, total, count)
+              .filter(DataProduct.annual_cost_amount.isnot(None))
+              .group_by(DataProduct.annual_cost_currency)
+              .all())
+    
+    today = date.today()
+    renewals = (DataProduct.query
+                .filter(DataProduct.contract_end.between(today, today + timedelta(days=days)))
+                .order_by(DataProduct.contract_end)
+                .all())
+    
+    return jsonify({
+        'total_spend': [{'currency': currency, 'total': amount, 'count': n} for currency, amount, n in totals],
+        'spend_by_vendor': spend_by(DataProduct.vendor, 'vendor'),
+        'spend_by_datatype': spend_by_facet('datatype', 'datatype'),
+        'spend_by_region': spend_by_facet('region', 'region'),
+        'upcoming_renewals': [{
+            'id': p.id,
+            'data_ID': p.data_ID,
+            'vendor': p.vendor,
+            'contract_end': p.contract_end.isoformat(),
+            'days_remaining': (p.contract_end - today).days,
+            'term': p.term,
+            'annual_cost_amount': p.annual_cost_amount,
+            'annual_cost_currency': p.annual_cost_currency
+        } for p in renewals],
+        'renewal_window_days': days
+    })
 
 if __name__ == '__main__':
     # Only enable debug mode if explicitly set via environment variable
@@ -0,0 +1,98 @@
+import gzip
+import json
+import threading
+from collections import OrderedDict
+
+# Optional codecs; gzip is always available
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+def available_encodings():
+    """Supported content codings, in server preference order"""
+    encodings = []
+    if zstandard is not None:
+        encodings.append('zstd')
+    if brotli is not None:
+        encodings.append('br')
+    encodings.append('gzip')
+    return encodings
+
+def negotiate_encoding(accept_encoding):
+    """Pick the best supported coding from an Accept-Encoding header, or None for identity"""
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding] = q
+    candidates = [(accepted.get(enc, accepted.get('*', 0.0)), -i, enc)
+                  for i, enc in enumerate(available_encodings())]
+    q, _, best = max(candidates)
+    return best if q > 0 else None
+
+def compress(data, encoding):
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    if encoding == 'br':
+        return brotli.compress(data, quality=9)
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=6)
+    return data
+
+def dump_json(payload):
+    """Serialize without pretty-printing whitespace"""
+    return json.dumps(payload, separators=(',', ':'), ensure_ascii=False, default=str).encode('utf-8')
+
+def compact_rows(rows, key_map):
+    """Drop null/empty values and shorten keys using key_map (long -> short)"""
+    return [{key_map.get(k, k): v for k, v in row.items() if v is not None and v != ''} for row in rows]
+
+class ResponseCache:
+    """Small thread-safe LRU of rendered, serialized or compressed response bodies.
+
+    Keys include a version stamp (catalog version or product updated_at), so
+    entries go stale on their own once the data changes and are evicted as
+    new versions come in.
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_create(self, key, factory):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        value = factory()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, match):
+        """Drop every entry whose key satisfies match(key)"""
+        with self._lock:
+            for key in [k for k in self._entries if match(k)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
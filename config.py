@@ -22,10 +22,53 @@ class Config:
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     ALLOWED_EXTENSIONS = {'pdf', 'doc', 'docx', 'xls', 'xlsx', 'txt', 'csv', 'png', 'jpg', 'jpeg', 'gif'}
+    
+    # JSON API responses smaller than this are sent uncompressed. gzip is always
+    # available; br and zstd are offered when brotli / zstandard are installed
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+    
+    # Rate limiting: per-client token buckets shared by workers via a local SQLite file
+    # (defaults to instance/ratelimit.db); see ratelimit.py for endpoint cost classes
+    RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', 'true').lower() == 'true'
+    RATELIMIT_STORAGE = os.environ.get('RATELIMIT_STORAGE')
+    RATELIMIT_CAPACITY = float(os.environ.get('RATELIMIT_CAPACITY', 60))
+    RATELIMIT_REFILL_PER_SEC = float(os.environ.get('RATELIMIT_REFILL_PER_SEC', 2))
+    # /api/suggest has its own, more generous bucket (several calls per keystroke)
+    RATELIMIT_TYPEAHEAD_CAPACITY = float(os.environ.get('RATELIMIT_TYPEAHEAD_CAPACITY', 120))
+    RATELIMIT_TYPEAHEAD_REFILL_PER_SEC = float(os.environ.get('RATELIMIT_TYPEAHEAD_REFILL_PER_SEC', 10))
+    # Concurrent heavy requests one client may run per worker
+    HEAVY_CONCURRENCY = int(os.environ.get('HEAVY_CONCURRENCY', 1))
+    # Concurrent heavy requests per worker from all clients; keep it at the gunicorn
+    # thread count minus one so interactive requests always have a free thread
+    HEAVY_WORKER_CONCURRENCY = int(os.environ.get('HEAVY_WORKER_CONCURRENCY', 1))
 
 # Sensitive columns (Z-AG) - hidden from non-admin users
 SENSITIVE_COLUMNS = [
     'user', 'contract_start', 'contract_end', 'term',
-    'annual_cost', 'price_cap', 'use_permissions', 'notes'
+    'annual_cost', 'price_cap', 'use_permissions', 'notes',
+    'annual_cost_amount', 'annual_cost_currency', 'price_cap_rate'
+]
+
+# Currency assumed for costs that don't state one
+DEFAULT_CURRENCY = os.environ.get('DEFAULT_CURRENCY', 'USD')
+
+
+# Columns backed by ColumnOption dropdowns in the product form
+DROPDOWN_COLUMNS = [
+    'asset_class', 'datatype', 'delivery_frequency', 'delivery_lag',
+    'delivery_method', 'region', 'stage', 'status'
 ]
 
+# Short keys used by ?compact=1 product listings (long name -> short key)
+COMPACT_KEYS = {
+    'id': 'i', 'data_ID': 'di', 'short_desc': 'sd', 'long_desc': 'ld', 'stage': 'sg',
+    'status': 'st', 'vendor_type': 'vt', 'datatype': 'dt', 'sub_datatype': 'sdt',
+    'asset_class': 'ac', 'coverage_details': 'cd', 'sector': 'sc', 'region': 'r',
+    'sub_region': 'sr', 's3_location': 's3', 'internal_location': 'il',
+    'delivery_frequency': 'df', 'delivery_lag': 'dl', 'vendor': 'v', 'prod_date': 'pd',
+    'trial_date': 'td', 'created_date': 'crd', 'end_date': 'ed', 'pit_date': 'pit',
+    'history_start': 'hs', 'delivery_method': 'dm', 'linked_docs': 'doc', 'user': 'u',
+    'contract_start': 'cs', 'contract_end': 'ce', 'term': 'tm', 'annual_cost': 'ann',
+    'price_cap': 'pc', 'annual_cost_amount': 'aca', 'annual_cost_currency': 'acc',
+    'price_cap_rate': 'pcr', 'use_permissions': 'up', 'notes': 'n', 'updated_at': 'ua'
+}
@@ -0,0 +1,80 @@
+import os
+import tempfile
+import pytest
+
+# app.py creates its database and rate-limit store at import time, so point
+# both at a scratch directory before any test imports it
+_tmp_dir = tempfile.mkdtemp(prefix='datacatalog-tests-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_tmp_dir, 'data_catalog.db')
+os.environ['RATELIMIT_STORAGE'] = os.path.join(_tmp_dir, 'ratelimit.db')
+
+
+@pytest.fixture
+def app(monkeypatch, tmp_path):
+    """The Flask app on an empty database with an admin and a standard user.
+
+    Foreign keys are enforced, as they are on PostgreSQL and MySQL. Rate
+    limiting is off unless a test turns it back on.
+    """
+    from sqlalchemy import event
+    import app as app_module
+    from models import db, ensure_schema, User
+
+    flask_app = app_module.app
+    monkeypatch.setitem(flask_app.config, 'RATELIMIT_ENABLED', False)
+    monkeypatch.setitem(flask_app.config, 'UPLOAD_FOLDER', str(tmp_path / 'uploads'))
+    with flask_app.app_context():
+        if not event.contains(db.engine, 'connect', _enable_foreign_keys):
+            event.listen(db.engine, 'connect', _enable_foreign_keys)
+            db.engine.dispose()
+        db.drop_all()
+        db.create_all()
+        ensure_schema()
+        for username, role in [('admin', 'admin'), ('user', 'standard')]:
+            user = User(username=username, role=role)
+            user.set_password('password')
+            db.session.add(user)
+        db.session.commit()
+
+    app_module.suggest_index.version = None
+    app_module.related_engine.version = None
+    app_module.response_cache.clear()
+    app_module.page_cache.clear()
+    yield flask_app
+    with flask_app.app_context():
+        db.session.remove()
+
+
+def _enable_foreign_keys(dbapi_connection, connection_record):
+    dbapi_connection.execute('PRAGMA foreign_keys=ON')
+
+
+def _login(client, username):
+    res = client.post('/api/login', json={'username': username, 'password': 'password'})
+    assert res.status_code == 200
+    return client
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def admin_client(app):
+    return _login(app.test_client(), 'admin')
+
+
+@pytest.fixture
+def user_client(app):
+    return _login(app.test_client(), 'user')
+
+
+@pytest.fixture
+def add_product(admin_client):
+    """Create a product through the API and return its id"""
+    def add(**fields):
+        res = admin_client.post('/api/products', json=fields)
+        assert res.status_code == 201
+        return res.get_json()['id']
+    return add
@@ -1,9 +1,76 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
+from datetime import datetime, timezone
+import re
+import time
 
 db = SQLAlchemy()
 
+def utcnow():
+    """Naive UTC timestamp, matching how DateTime columns are stored"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+CURRENCY_SYMBOLS = {'$': 'USD', '€': 'EUR', '£': 'GBP', '¥': 'JPY'}
+CURRENCY_CODES = {'USD', 'EUR', 'GBP', 'JPY', 'CHF', 'CAD', 'AUD', 'HKD', 'SGD', 'INR', 'CNY'}
+NUMBER_RE = re.compile(r'\d[\d,]*(?:\.\d+)?')
+# Scale words allowed directly after the number
+MULTIPLIERS = {'k': 1e3, 'thousand': 1e3, 'm': 1e6, 'mm': 1e6, 'mn': 1e6, 'million': 1e6,
+               'bn': 1e9, 'billion': 1e9}
+# Other words that may appear in a cost without changing its meaning
+COST_FILLER_WORDS = {'p', 'a', 'pa', 'per', 'year', 'yr', 'annum', 'annual', 'annually', 'approx'}
+
+def parse_cost(text):
+    """Parse free-text cost like '127500', '$120,000' or 'EUR 1.2 million' into (amount, currency).
+
+    Returns (None, None) unless the text holds exactly one number and every
+    word is a scale, a currency code or a known filler word such as 'p.a.'.
+    """
+    if text is None or not str(text).strip():
+        return None, None
+    text = str(text).strip()
+    numbers = NUMBER_RE.findall(text)
+    if len(numbers) != 1:
+        return None, None
+    number = NUMBER_RE.search(text)
+    amount = float(number.group(0).replace(',', ''))
+    rest = text[:number.start()] + ' ' + text[number.end():]
+    unit = re.match(r'\s*([A-Za-z]+)\b', text[number.end():])
+    if unit and unit.group(1).lower() in MULTIPLIERS:
+        amount *= MULTIPLIERS[unit.group(1).lower()]
+        rest = text[:number.start()] + ' ' + text[number.end() + unit.end():]
+
+    currencies = {code for sym, code in CURRENCY_SYMBOLS.items() if sym in rest}
+    for word in re.findall(r'[A-Za-z]+', rest):
+        if word.upper() in CURRENCY_CODES:
+            currencies.add(word.upper())
+        elif word.lower() not in COST_FILLER_WORDS:
+            return None, None
+    if len(currencies) > 1:
+        return None, None
+    from config import DEFAULT_CURRENCY
+    return amount, currencies.pop() if currencies else DEFAULT_CURRENCY
+
+def parse_rate(text):
+    """Parse a price cap into a fraction; non-numeric caps (e.g. 'CPI') give None.
+
+    '5%' and bare numbers of 1 or more are percentages ('1' -> 0.01,
+    '1.5' -> 0.015); bare numbers below 1 are already fractions ('0.05').
+    """
+    if text is None:
+        return None
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*(%?)\s*', str(text))
+    if not match:
+        return None
+    rate = float(match.group(1))
+    return rate / 100 if match.group(2) or rate >= 1 else rate
+
+def split_values(value):
+    """Split a comma-separated multi-value field into its cleaned parts"""
+    if value is None:
+        return []
+    return [v.strip() for v in str(value).split(',') if v.strip() and v.strip().lower() not in ['nan', 'none']]
+
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
     id = db.Column(db.Integer, primary_key=True)
@@ -27,18 +94,18 @@ class DataProduct(db.Model):
     stage = db.Column(db.String(100))
     status = db.Column(db.String(100))
     vendor_type = db.Column(db.String(100))
-    datatype = db.Column(db.String(200))
+    datatype = db.Column(db.String(200), index=True)
     sub_datatype = db.Column(db.String(200))
     asset_class = db.Column(db.String(200))
     coverage_details = db.Column(db.String(500))
     sector = db.Column(db.String(200))
-    region = db.Column(db.String(100))
+    region = db.Column(db.String(100), index=True)
     sub_region = db.Column(db.String(100))
     s3_location = db.Column(db.String(500))
     internal_location = db.Column(db.String(500))
     delivery_frequency = db.Column(db.String(100))
     delivery_lag = db.Column(db.String(100))
-    vendor = db.Column(db.String(200))
+    vendor = db.Column(db.String(200), index=True)
     prod_date = db.Column(db.Date)
     trial_date = db.Column(db.Date)
     created_date = db.Column(db.Date)
@@ -50,12 +117,36 @@ class DataProduct(db.Model):
     # Sensitive columns (Z-AG)
     user = db.Column(db.String(100))
     contract_start = db.Column(db.Date)
-    contract_end = db.Column(db.Date)
+    contract_end = db.Column(db.Date, index=True)
     term = db.Column(db.String(100))
     annual_cost = db.Column(db.String(100))
     price_cap = db.Column(db.String(100))
+    # Normalized from annual_cost / price_cap by normalize_costs()
+    annual_cost_amount = db.Column(db.Float)
+    annual_cost_currency = db.Column(db.String(3))
+    price_cap_rate = db.Column(db.Float)
     use_permissions = db.Column(db.Text)
     notes = db.Column(db.Text)
+    updated_at = db.Column(db.DateTime, default=utcnow, onupdate=utcnow)
+
+    # One row per value of the multi-value facet columns, for SQL grouping
+    facets = db.relationship('ProductFacet', cascade='all, delete-orphan')
+
+    def normalize_facets(self):
+        """Sync the product_facets rows with the comma-separated facet columns"""
+        wanted = {(field, v) for field in ProductFacet.FIELDS for v in split_values(getattr(self, field))}
+        for facet in list(self.facets):
+            if (facet.field, facet.value) not in wanted:
+                self.facets.remove(facet)
+            else:
+                wanted.discard((facet.field, facet.value))
+        for field, value in sorted(wanted):
+            self.facets.append(ProductFacet(field=field, value=value))
+
+    def normalize_costs(self):
+        """Populate the numeric cost columns from the free-text ones"""
+        self.annual_cost_amount, self.annual_cost_currency = parse_cost(self.annual_cost)
+        self.price_cap_rate = parse_rate(self.price_cap)
 
     def to_dict(self, include_sensitive=False):
         from config import SENSITIVE_COLUMNS
@@ -88,3 +179,91 @@ class ColumnOption(db.Model):
             'is_multi_value': self.is_multi_value
         }
 
+
+class ProductFacet(db.Model):
+    """A single value of a comma-separated facet column (see DataProduct.normalize_facets)"""
+    __tablename__ = 'product_facets'
+    FIELDS = ['datatype', 'region']
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('data_products.id'), nullable=False, index=True)
+    field = db.Column(db.String(50), nullable=False)
+    value = db.Column(db.String(200), nullable=False)
+    __table_args__ = (db.Index('ix_product_facets_field_value', 'field', 'value'),)
+
+class RelatedProduct(db.Model):
+    """Precomputed nearest neighbors for a data product (see related.py)"""
+    __tablename__ = 'related_products'
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('data_products.id'), nullable=False, index=True)
+    related_id = db.Column(db.Integer, db.ForeignKey('data_products.id'), nullable=False)
+    rank = db.Column(db.Integer, nullable=False)
+    score = db.Column(db.Float, nullable=False)
+
+class CatalogVersion(db.Model):
+    """Single-row counter bumped on every catalog write, shared by all workers"""
+    __tablename__ = 'catalog_version'
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    # Catalog version at which related_products was last fully rebuilt; None until built
+    related_version = db.Column(db.Integer)
+
+def get_catalog_version():
+    return db.session.query(CatalogVersion.version).filter_by(id=1).scalar() or 0
+
+def bump_catalog_version():
+    """Increment the catalog version as part of the current transaction.
+
+    Returns the new version; the row stays locked until the transaction ends,
+    so it is this write's own version.
+    """
+    db.session.execute(db.update(CatalogVersion).where(CatalogVersion.id == 1)
+                       .values(version=CatalogVersion.version + 1))
+    return get_catalog_version()
+
+def ensure_schema():
+    """Bring an existing database up to date with the models.
+
+    db.create_all() only creates missing tables, so columns and indexes added
+    to existing tables later are created here, and new columns are backfilled.
+    Backfills change API payloads, so they bump the catalog version (and with
+    it the ETags of cached responses).
+    """
+    inspector = db.inspect(db.engine)
+    added = []
+    for model in [DataProduct, CatalogVersion]:
+        table = model.__table__
+        existing = {c['name'] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                col_type = column.type.compile(db.engine.dialect)
+                name = db.engine.dialect.identifier_preparer.quote(column.name)
+                db.session.execute(db.text(f'ALTER TABLE {table.name} ADD COLUMN {name} {col_type}'))
+                added.append(column.name)
+    db.session.commit()
+    for index in DataProduct.__table__.indexes:
+        index.create(db.engine, checkfirst=True)
+    if db.session.get(CatalogVersion, 1) is None:
+        # Start from the clock so a recreated database never reuses the
+        # versions (and ETags) of the one it replaced
+        db.session.add(CatalogVersion(id=1, version=int(time.time())))
+        db.session.commit()
+    backfilled = False
+    if 'updated_at' in added:
+        db.session.execute(db.update(DataProduct).values(updated_at=utcnow()))
+        db.session.commit()
+        backfilled = True
+    if {'annual_cost_amount', 'price_cap_rate'} & set(added):
+        for product in DataProduct.query.filter(db.or_(DataProduct.annual_cost.isnot(None),
+                                                       DataProduct.price_cap.isnot(None))):
+            product.normalize_costs()
+        db.session.commit()
+        backfilled = True
+    if db.session.query(ProductFacet.id).first() is None:
+        for product in DataProduct.query.filter(db.or_(DataProduct.datatype.isnot(None),
+                                                       DataProduct.region.isnot(None))):
+            product.normalize_facets()
+            backfilled = backfilled or bool(product.facets)
+        db.session.commit()
+    if backfilled:
+        bump_catalog_version()
+        db.session.commit()
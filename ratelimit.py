@@ -0,0 +1,119 @@
+import math
+import random
+import sqlite3
+import threading
+import time
+
+# Cost class -> (tokens per request, bucket). Typeahead draws from its own
+# bucket so typing in the search box can't use up the budget for page loads.
+COST_CLASSES = {
+    'heavy': (5, 'api'),
+    'medium': (2, 'api'),
+    'light': (1, 'api'),
+    'typeahead': (1, 'typeahead'),
+}
+
+# Endpoint (view function name) -> cost class; unlisted endpoints are not limited
+ENDPOINT_COSTS = {
+    'get_products': 'heavy',
+    'get_filters': 'heavy',
+    'get_analytics': 'heavy',
+    'get_related_products': 'medium',
+    'get_product': 'medium',
+    'get_column_options': 'medium',
+    'get_all_column_options': 'medium',
+    'dataset_detail': 'light',
+    'suggest': 'typeahead',
+}
+
+class TokenBucketStore:
+    """Per-client token buckets in a local SQLite file shared by all workers.
+
+    Each bucket holds up to `capacity` tokens and refills at `refill_rate`
+    tokens per second. Updates run in short IMMEDIATE transactions; if the
+    store is busy or unavailable the request is admitted rather than queued.
+    """
+
+    def __init__(self, path, capacity, refill_rate, busy_timeout=0.05):
+        self.path = path
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            conn.execute('CREATE TABLE IF NOT EXISTS buckets '
+                         '(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)')
+            self._local.conn = conn
+        return conn
+
+    def take(self, key, cost, now=None):
+        """Try to take `cost` tokens from a bucket.
+
+        Returns (allowed, retry_after_seconds).
+        """
+        now = time.time() if now is None else now
+        try:
+            conn = self._connect()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = conn.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+                tokens = self.capacity
+                if row:
+                    tokens = min(self.capacity, row[0] + (now - row[1]) * self.refill_rate)
+                allowed = tokens >= cost
+                if allowed:
+                    tokens -= cost
+                conn.execute('INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)',
+                             (key, tokens, now))
+                # Occasionally drop buckets that have been idle long enough to be full again
+                if random.random() < 0.01:
+                    conn.execute('DELETE FROM buckets WHERE updated < ?',
+                                 (now - self.capacity / self.refill_rate,))
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        except sqlite3.Error:
+            return True, 0
+        if allowed:
+            return True, 0
+        return False, max(1, math.ceil((cost - tokens) / self.refill_rate))
+
+class AdmissionGate:
+    """Per-worker caps on concurrent heavy requests; never blocks.
+
+    A heavy request is turned away when its client already runs
+    `per_client` heavy requests in this worker, or when the worker already
+    runs `total` of them from anyone. Keeping `total` below the worker's
+    thread count leaves a thread free for interactive requests.
+    """
+
+    def __init__(self, per_client, total):
+        self.per_client = per_client
+        self.total = total
+        self._in_flight = {}
+        self._running = 0
+        self._lock = threading.Lock()
+
+    def try_enter(self, client):
+        with self._lock:
+            if self._running >= self.total or self._in_flight.get(client, 0) >= self.per_client:
+                return False
+            self._in_flight[client] = self._in_flight.get(client, 0) + 1
+            self._running += 1
+            return True
+
+    def leave(self, client):
+        with self._lock:
+            remaining = self._in_flight.get(client, 0) - 1
+            if remaining > 0:
+                self._in_flight[client] = remaining
+            else:
+                self._in_flight.pop(client, None)
+            self._running = max(0, self._running - 1)
@@ -0,0 +1,189 @@
+import re
+from collections import Counter
+import numpy as np
+
+# Fields feeding the TF-IDF text vectors and the one-hot facet vectors
+TEXT_FIELDS = ['short_desc', 'long_desc']
+FACET_FIELDS = ['vendor', 'region', 'asset_class', 'datatype']
+
+TEXT_WEIGHT = 0.6
+FACET_WEIGHT = 0.4
+TOP_K = 5
+BATCH_SIZE = 256
+MAX_FEATURES = 5000
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'data', 'for', 'from', 'in',
+    'is', 'it', 'of', 'on', 'or', 'that', 'the', 'this', 'to', 'with'
+}
+
+def tokenize(text):
+    """Lowercase word tokens, dropping stopwords and single characters"""
+    if not text:
+        return []
+    return [t for t in TOKEN_RE.findall(str(text).lower()) if len(t) > 1 and t not in STOPWORDS]
+
+def facet_values(product):
+    """Return 'field=value' features for the facet columns, splitting comma-separated values"""
+    features = set()
+    for field in FACET_FIELDS:
+        value = getattr(product, field, None)
+        if not value:
+            continue
+        for v in str(value).split(','):
+            v = v.strip().lower()
+            if v and v not in ['nan', 'none']:
+                features.add(f'{field}={v}')
+    return features
+
+class SimilarityEngine:
+    """TF-IDF + facet similarity over data products with precomputed top-k neighbors.
+
+    Vectors are dense float32 matrices with L2-normalized rows, so cosine
+    similarity is a matrix product. Neighbors are computed in row batches.
+    Incremental refreshes reuse the vocabularies of the last full rebuild, so
+    a product with terms or facets they haven't seen needs a rebuild instead
+    (see covers()).
+    """
+
+    def __init__(self, top_k=TOP_K):
+        self.top_k = top_k
+        self.ids = []
+        self.rows = {}
+        self.vocab = {}
+        self.known_terms = set()
+        self.idf = None
+        self.facet_vocab = {}
+        self.text = None
+        self.facets = None
+        self.neighbors = {}
+        self.version = None
+
+    @staticmethod
+    def signature(product):
+        """Values that affect a product's vectors, used to skip no-op refreshes"""
+        return tuple(getattr(product, f, None) for f in TEXT_FIELDS + FACET_FIELDS)
+
+    @staticmethod
+    def _tokens(product):
+        return tokenize(' '.join(str(getattr(product, f, None) or '') for f in TEXT_FIELDS))
+
+    def covers(self, product):
+        """Whether every term and facet of a product was seen by the last rebuild"""
+        return (self.known_terms.issuperset(self._tokens(product))
+                and all(f in self.facet_vocab for f in facet_values(product)))
+
+    def _text_vector(self, product):
+        vec = np.zeros(len(self.vocab), dtype=np.float32)
+        tokens = self._tokens(product)
+        counts = Counter(t for t in tokens if t in self.vocab)
+        total = sum(counts.values())
+        for term, count in counts.items():
+            vec[self.vocab[term]] = count / total
+        vec *= self.idf
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def _facet_vector(self, product):
+        vec = np.zeros(len(self.facet_vocab), dtype=np.float32)
+        for feature in facet_values(product):
+            if feature in self.facet_vocab:
+                vec[self.facet_vocab[feature]] = 1.0
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def rebuild(self, products):
+        """Fit the vocabulary and recompute every vector and neighbor list"""
+        products = list(products)
+        docs = [set(self._tokens(p)) for p in products]
+        df = Counter(t for doc in docs for t in doc)
+        # Terms cut by MAX_FEATURES still count as seen, so they don't force rebuilds
+        self.known_terms = set(df)
+        terms = sorted(t for t, _ in df.most_common(MAX_FEATURES))
+        self.vocab = {t: i for i, t in enumerate(terms)}
+        n = len(products)
+        self.idf = np.array([np.log((1 + n) / (1 + df[t])) + 1 for t in terms], dtype=np.float32)
+        features = sorted(set().union(*(facet_values(p) for p in products))) if products else []
+        self.facet_vocab = {f: i for i, f in enumerate(features)}
+
+        self.ids = [p.id for p in products]
+        self.rows = {pid: i for i, pid in enumerate(self.ids)}
+        self.text = np.array([self._text_vector(p) for p in products], dtype=np.float32).reshape(n, len(self.vocab))
+        self.facets = np.array([self._facet_vector(p) for p in products], dtype=np.float32).reshape(n, len(self.facet_vocab))
+        self.neighbors = {}
+        self._recompute(range(n))
+        return set(self.ids)
+
+    def _similarities(self, row_indices):
+        return (TEXT_WEIGHT * (self.text[row_indices] @ self.text.T)
+                + FACET_WEIGHT * (self.facets[row_indices] @ self.facets.T))
+
+    def _recompute(self, row_indices):
+        """Recompute top-k neighbors for the given rows, BATCH_SIZE rows at a time"""
+        row_indices = np.fromiter(row_indices, dtype=np.int64)
+        n = len(self.ids)
+        k = min(self.top_k, n - 1)
+        for start in range(0, len(row_indices), BATCH_SIZE):
+            batch = row_indices[start:start + BATCH_SIZE]
+            if k <= 0:
+                for row in batch:
+                    self.neighbors[self.ids[row]] = []
+                continue
+            sims = self._similarities(batch)
+            sims[np.arange(len(batch)), batch] = -np.inf
+            kth = -np.partition(-sims, k - 1, axis=1)[:, k - 1]
+            for i, row in enumerate(batch):
+                # Take everything tied with the k-th score, then break ties by id
+                candidates = np.nonzero(sims[i] >= kth[i])[0]
+                ranked = sorted(((float(sims[i, j]), self.ids[j]) for j in candidates),
+                                key=lambda c: (-c[0], c[1]))[:k]
+                self.neighbors[self.ids[row]] = [(pid, score) for score, pid in ranked if score > 0]
+
+    def refresh(self, product):
+        """Add or update one product's vectors and refresh the neighbor lists it affects.
+
+        Returns the ids whose neighbor lists changed.
+        """
+        text_vec = self._text_vector(product)
+        facet_vec = self._facet_vector(product)
+        if product.id in self.rows:
+            row = self.rows[product.id]
+            self.text[row] = text_vec
+            self.facets[row] = facet_vec
+        else:
+            row = len(self.ids)
+            self.ids.append(product.id)
+            self.rows[product.id] = row
+            self.text = np.vstack([self.text, text_vec[None, :]])
+            self.facets = np.vstack([self.facets, facet_vec[None, :]])
+
+        sims = self._similarities([row])[0]
+        affected = {row}
+        for pid, other in self.rows.items():
+            if other == row:
+                continue
+            current = self.neighbors.get(pid, [])
+            if (any(rid == product.id for rid, _ in current) or len(current) < self.top_k
+                    or sims[other] > current[-1][1]):
+                affected.add(other)
+        self._recompute(sorted(affected))
+        return {self.ids[r] for r in affected}
+
+    def remove(self, product_id):
+        """Drop a product and refresh the neighbor lists that referenced it.
+
+        Returns the ids whose neighbor lists changed.
+        """
+        if product_id not in self.rows:
+            return set()
+        row = self.rows[product_id]
+        self.text = np.delete(self.text, row, axis=0)
+        self.facets = np.delete(self.facets, row, axis=0)
+        self.ids.pop(row)
+        self.rows = {pid: i for i, pid in enumerate(self.ids)}
+        self.neighbors.pop(product_id, None)
+        affected = [self.rows[pid] for pid, nbrs in self.neighbors.items()
+                    if any(rid == product_id for rid, _ in nbrs)]
+        self._recompute(affected)
+        return {self.ids[r] for r in affected}
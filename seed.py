@@ -1,23 +1,15 @@
 import pandas as pd
 from app import app, db
-from models import DataProduct, ColumnOption
+from models import DataProduct, ColumnOption, ProductFacet, RelatedProduct, CatalogVersion, bump_catalog_version
+from config import DROPDOWN_COLUMNS
 
-# Columns that should have dropdowns
-# Will be auto-detected for multi-value based on comma-separated values in data
-DROPDOWN_COLUMNS = [
-    'asset_class',
-    'datatype',
-    'delivery_frequency',
-    'delivery_lag',
-    'delivery_method',
-    'region',
-    'stage',
-    'status',
-]
 
 def seed_database():
     with app.app_context():
-        # Clear existing data
+        # Clear existing data (bulk deletes don't cascade to child tables)
+        ProductFacet.query.delete()
+        RelatedProduct.query.delete()
+        db.session.execute(db.update(CatalogVersion).values(related_version=None))
         DataProduct.query.delete()
         ColumnOption.query.delete()
         
@@ -87,8 +79,11 @@ def seed_database():
                     else:
                         val = None
                 setattr(product, col, val)
+            product.normalize_costs()
+            product.normalize_facets()
             db.session.add(product)
         
+        bump_catalog_version()
         db.session.commit()
         print(f"Seeded {len(df)} data products")
         print(f"Seeded {ColumnOption.query.count()} column options")
@@ -18,6 +18,16 @@ function escapeHtml(text) {
     return str.replace(/[&<>"']/g, m => map[m]);
 }
 
+// Rate-limited endpoints answer 429 with Retry-After; wait and retry a few times
+async function fetchWithRetry(url, options = {}, retries = 3) {
+    for (let attempt = 0; ; attempt++) {
+        const res = await fetch(url, options);
+        if (res.status !== 429 || attempt >= retries) return res;
+        const retryAfter = Math.min(parseInt(res.headers.get('Retry-After'), 10) || 1, 10);
+        await new Promise(resolve => setTimeout(resolve, retryAfter * 1000));
+    }
+}
+
 // Initialize
 document.addEventListener('DOMContentLoaded', async () => {
     await checkAuth();
@@ -58,7 +68,8 @@ function updateAuthUI() {
 }
 
 async function loadFilters() {
-    const res = await fetch('/api/filters');
+    const res = await fetchWithRetry('/api/filters');
+    if (!res.ok) return;
     const filters = await res.json();
     
     renderFilterList('categoryFilters', filters.categories, 'categories');
@@ -80,8 +91,16 @@ function renderFilterList(containerId, items, filterKey) {
 }
 
 async function loadProducts() {
-    const res = await fetch('/api/products');
-    allProducts = await res.json();
+    // Compact mode omits nulls and uses short keys; expand them back here
+    const res = await fetchWithRetry('/api/products?compact=1');
+    if (!res.ok) {
+        document.getElementById('resultsCount').textContent = 'Could not load datasets, please refresh';
+        return;
+    }
+    const { keys, items } = await res.json();
+    allProducts = items.map(item => Object.fromEntries(
+        Object.entries(item).map(([k, v]) => [keys[k] || k, v])
+    ));
     filteredProducts = [...allProducts];
     updateStats();
     renderProducts();
@@ -170,9 +189,54 @@ function applyFilters() {
     renderProducts();
 }
 
+let suggestTimer = null;
+
+async function loadSuggestions(prefix) {
+    const datalist = document.getElementById('searchSuggestions');
+    if (!prefix) {
+        datalist.innerHTML = '';
+        return;
+    }
+    const fields = ['vendor', 'data_ID', 'short_desc'];
+    const results = await Promise.all(fields.map(field =>
+        fetch(`/api/suggest?field=${field}&prefix=${encodeURIComponent(prefix)}&limit=5`)
+            .then(res => res.ok ? res.json() : { suggestions: [] })
+    ));
+    const values = [...new Set(results.flatMap(r => r.suggestions.map(s => s.value)))];
+    datalist.innerHTML = values.map(v => `<option value="${escapeHtml(v)}"></option>`).join('');
+}
+
+let formSuggestTimer = null;
+
+// Free-text form fields suggest existing values as you type. The dropdown
+// columns keep the full /api/column-options list: a <select> or tag picker
+// has to show every allowed value, not just those matching a prefix.
+async function loadFieldSuggestions(field, prefix, datalistId) {
+    const datalist = document.getElementById(datalistId);
+    if (!prefix) {
+        datalist.innerHTML = '';
+        return;
+    }
+    const res = await fetch(`/api/suggest?field=${field}&prefix=${encodeURIComponent(prefix)}&limit=10`);
+    if (!res.ok) return;
+    const { suggestions } = await res.json();
+    datalist.innerHTML = suggestions.map(s => `<option value="${escapeHtml(s.value)}"></option>`).join('');
+}
+
 function setupEventListeners() {
     // Search
-    document.getElementById('searchInput').addEventListener('input', applyFilters);
+    document.getElementById('searchInput').addEventListener('input', (e) => {
+        applyFilters();
+        clearTimeout(suggestTimer);
+        const prefix = e.target.value.trim();
+        suggestTimer = setTimeout(() => loadSuggestions(prefix), 150);
+    });
+    
+    document.querySelector('#productForm input[name="vendor"]').addEventListener('input', (e) => {
+        clearTimeout(formSuggestTimer);
+        const prefix = e.target.value.trim();
+        formSuggestTimer = setTimeout(() => loadFieldSuggestions('vendor', prefix, 'vendorSuggestions'), 150);
+    });
     
     // Filter checkboxes
     document.getElementById('sidebar').addEventListener('change', (e) => {
@@ -276,10 +340,12 @@ function getFileName(path) {
 }
 
 async function showProductDetail(id) {
-    const res = await fetch(`/api/products/${id}`);
+    const res = await fetchWithRetry(`/api/products/${id}`);
+    if (!res.ok) return;
     const product = await res.json();
     
-    const sensitiveFields = ['user', 'contract_start', 'contract_end', 'term', 'annual_cost', 'price_cap', 'use_permissions', 'notes'];
+    const sensitiveFields = ['user', 'contract_start', 'contract_end', 'term', 'annual_cost', 'price_cap', 'use_permissions', 'notes',
+                             'annual_cost_amount', 'annual_cost_currency', 'price_cap_rate'];
     const isAdmin = currentUser && currentUser.role === 'admin';
     const skipFields = ['id', 'short_desc', 'long_desc', 'data_ID', 'linked_docs'];
     
@@ -364,7 +430,11 @@ async function openProductForm(id = null) {
     });
     
     // Load column options and populate dropdowns
-    const optionsRes = await fetch('/api/column-options');
+    const optionsRes = await fetchWithRetry('/api/column-options');
+    if (!optionsRes.ok) {
+        alert('Could not load form options, please try again');
+        return;
+    }
     const options = await optionsRes.json();
     
     const dropdownColumns = ['asset_class', 'datatype', 'delivery_frequency', 'delivery_lag', 
@@ -436,7 +506,11 @@ async function openProductForm(id = null) {
     
     if (id) {
         document.getElementById('editModalTitle').textContent = 'Edit Dataset';
-        const res = await fetch(`/api/products/${id}`);
+        const res = await fetchWithRetry(`/api/products/${id}`);
+        if (!res.ok) {
+            alert('Could not load dataset, please try again');
+            return;
+        }
         const product = await res.json();
         for (const [key, value] of Object.entries(product)) {
             const input = form.elements[key];
@@ -682,12 +756,17 @@ let columnOptions = {};
 let selectedColumn = null;
 
 async function openOptionsModal() {
-    await loadColumnOptions();
-    showModal('optionsModal');
+    if (await loadColumnOptions()) {
+        showModal('optionsModal');
+    }
 }
 
 async function loadColumnOptions() {
-    const res = await fetch('/api/column-options');
+    const res = await fetchWithRetry('/api/column-options');
+    if (!res.ok) {
+        alert('Could not load column options, please try again');
+        return false;
+    }
     columnOptions = await res.json();
     
     const columnList = document.getElementById('columnList');
@@ -700,6 +779,7 @@ async function loadColumnOptions() {
     columnList.querySelectorAll('.column-item').forEach(item => {
         item.addEventListener('click', () => selectColumn(item.dataset.column));
     });
+    return true;
 }
 
 function selectColumn(colName) {
@@ -0,0 +1,152 @@
+import re
+import threading
+from bisect import bisect_left, insort
+from heapq import nlargest
+from config import DROPDOWN_COLUMNS
+
+# Fields served by /api/suggest, besides any ColumnOption column
+WHOLE_VALUE_FIELDS = ['data_ID']
+TOKEN_FIELDS = ['short_desc']
+SPLIT_FIELDS = ['vendor'] + DROPDOWN_COLUMNS
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+def extract_terms(field, value):
+    """Return the distinct suggestion terms a product field contributes"""
+    if value is None:
+        return set()
+    value_str = str(value).strip()
+    if not value_str or value_str.lower() in ['nan', 'none']:
+        return set()
+    if field in TOKEN_FIELDS:
+        return {t.lower() for t in TOKEN_RE.findall(value_str) if len(t) > 1}
+    if field in WHOLE_VALUE_FIELDS:
+        return {value_str}
+    return {v.strip() for v in value_str.split(',') if v.strip() and v.strip().lower() not in ['nan', 'none']}
+
+class PrefixIndex:
+    """In-memory prefix index over sorted (lowercase, value) arrays.
+
+    Each field keeps a frequency map of product occurrences, a set of
+    ColumnOption values (suggested with count 0 until a product uses them)
+    and a sorted key list; a prefix lookup is two bisects plus a top-k over
+    the matching slice. `version` is the catalog version the index reflects;
+    sync() and apply() check and move it under the same lock as the data.
+    """
+
+    def __init__(self):
+        self._counts = {}
+        self._options = {}
+        self._keys = {}
+        self._lock = threading.RLock()
+        self.version = None
+
+    def _insert_key(self, field, term):
+        keys = self._keys.setdefault(field, [])
+        key = (term.lower(), term)
+        pos = bisect_left(keys, key)
+        if pos == len(keys) or keys[pos] != key:
+            insort(keys, key)
+
+    def _drop_key_if_unused(self, field, term):
+        if term in self._counts.get(field, {}) or term in self._options.get(field, set()):
+            return
+        keys = self._keys.get(field, [])
+        pos = bisect_left(keys, (term.lower(), term))
+        if pos < len(keys) and keys[pos] == (term.lower(), term):
+            del keys[pos]
+
+    def _add(self, field, term):
+        counts = self._counts.setdefault(field, {})
+        if term not in counts:
+            self._insert_key(field, term)
+            counts[term] = 0
+        counts[term] += 1
+
+    def _remove(self, field, term):
+        counts = self._counts.get(field)
+        if not counts or term not in counts:
+            return
+        counts[term] -= 1
+        if counts[term] <= 0:
+            del counts[term]
+            self._drop_key_if_unused(field, term)
+
+    def _add_option(self, field, value):
+        self._options.setdefault(field, set()).add(value)
+        self._insert_key(field, value)
+
+    @staticmethod
+    def product_terms(product):
+        """Snapshot the terms of a product, keyed by field"""
+        fields = WHOLE_VALUE_FIELDS + TOKEN_FIELDS + SPLIT_FIELDS
+        return {f: extract_terms(f, getattr(product, f, None)) for f in fields}
+
+    def rebuild(self, products, options, version=None):
+        """Rebuild the whole index from products and ColumnOption rows"""
+        with self._lock:
+            self._counts = {}
+            self._options = {}
+            self._keys = {}
+            for product in products:
+                for field, terms in self.product_terms(product).items():
+                    for term in terms:
+                        self._add(field, term)
+            for opt in options:
+                self._add_option(opt.column_name, opt.value)
+            self.version = version
+
+    def sync(self, version, load):
+        """Rebuild from load() -> (products, options) unless already at `version`"""
+        with self._lock:
+            if self.version != version:
+                products, options = load()
+                self.rebuild(products, options, version)
+
+    def apply(self, version, update):
+        """Run update(index) for the write that produced `version`.
+
+        Only applies when the index was current just before that write;
+        otherwise the next sync() sees the mismatch and rebuilds. Returns
+        whether the update was applied.
+        """
+        with self._lock:
+            if self.version is None or self.version != version - 1:
+                return False
+            update(self)
+            self.version = version
+            return True
+
+    def update_terms(self, old_terms, new_terms):
+        """Apply the difference between two product term snapshots"""
+        with self._lock:
+            for field in set(old_terms) | set(new_terms):
+                old = old_terms.get(field, set())
+                new = new_terms.get(field, set())
+                for term in old - new:
+                    self._remove(field, term)
+                for term in new - old:
+                    self._add(field, term)
+
+    def add_option(self, column_name, value):
+        with self._lock:
+            self._add_option(column_name, value)
+
+    def remove_option(self, column_name, value):
+        with self._lock:
+            self._options.get(column_name, set()).discard(value)
+            self._drop_key_if_unused(column_name, value)
+
+    def has_field(self, field):
+        return field in self._keys
+
+    def suggest(self, field, prefix, limit=10):
+        """Return up to `limit` (value, count) pairs starting with `prefix`, most frequent first"""
+        prefix = (prefix or '').lower()
+        with self._lock:
+            keys = self._keys.get(field, [])
+            counts = self._counts.get(field, {})
+            lo = bisect_left(keys, (prefix,))
+            hi = bisect_left(keys, (prefix + '\uffff',)) if prefix else len(keys)
+            top = nlargest(limit, keys[lo:hi], key=lambda k: counts.get(k[1], 0))
+            return [(value, counts.get(value, 0)) for _, value in top]
@@ -0,0 +1,39 @@
+from datetime import date, timedelta
+
+
+def test_analytics_requires_admin(client, user_client):
+    assert client.get('/api/analytics').status_code == 401
+    assert user_client.get('/api/analytics').status_code == 403
+
+
+def test_analytics_validates_days(admin_client):
+    assert admin_client.get('/api/analytics?days=soon').status_code == 400
+    assert admin_client.get('/api/analytics?days=-5').get_json()['renewal_window_days'] == 0
+    assert admin_client.get('/api/analytics?days=99999').get_json()['renewal_window_days'] == 3650
+
+
+def test_analytics_groups_split_facets(add_product, admin_client):
+    add_product(data_ID='a', vendor='Bloomberg', datatype='News, Sentiment', region='USA',
+                annual_cost='$100,000')
+    add_product(data_ID='b', vendor='Bloomberg', datatype='News', region='USA, GLB',
+                annual_cost='50000 USD')
+    add_product(data_ID='c', vendor='MSCI', datatype='Risk', annual_cost='TBD')
+    data = admin_client.get('/api/analytics').get_json()
+
+    assert data['total_spend'] == [{'currency': 'USD', 'total': 150000.0, 'count': 2}]
+    assert data['spend_by_vendor'] == [{'vendor': 'Bloomberg', 'currency': 'USD', 'total': 150000.0, 'count': 2}]
+    by_datatype = {row['datatype']: (row['total'], row['count']) for row in data['spend_by_datatype']}
+    assert by_datatype == {'News': (150000.0, 2), 'Sentiment': (100000.0, 1)}
+    by_region = {row['region']: (row['total'], row['count']) for row in data['spend_by_region']}
+    assert by_region == {'USA': (150000.0, 2), 'GLB': (50000.0, 1)}
+
+
+def test_analytics_upcoming_renewals(add_product, admin_client):
+    soon = (date.today() + timedelta(days=10)).isoformat()
+    later = (date.today() + timedelta(days=200)).isoformat()
+    add_product(data_ID='soon', vendor='Bloomberg', contract_end=soon)
+    add_product(data_ID='later', vendor='MSCI', contract_end=later)
+    renewals = admin_client.get('/api/analytics?days=30').get_json()['upcoming_renewals']
+    assert [(r['data_ID'], r['days_remaining']) for r in renewals] == [('soon', 10)]
+    renewals = admin_client.get('/api/analytics?days=365').get_json()['upcoming_renewals']
+    assert [r['data_ID'] for r in renewals] == ['soon', 'later']
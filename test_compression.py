@@ -0,0 +1,58 @@
+import gzip
+import pytest
+import compression
+from compression import negotiate_encoding, compress, compact_rows, ResponseCache
+
+
+@pytest.fixture
+def gzip_only(monkeypatch):
+    monkeypatch.setattr(compression, 'brotli', None)
+    monkeypatch.setattr(compression, 'zstandard', None)
+
+
+@pytest.fixture
+def all_codecs(monkeypatch):
+    monkeypatch.setattr(compression, 'brotli', object())
+    monkeypatch.setattr(compression, 'zstandard', object())
+
+
+def test_negotiate_gzip_only(gzip_only):
+    assert negotiate_encoding('gzip, deflate, br') == 'gzip'
+    assert negotiate_encoding('GZIP') == 'gzip'
+    assert negotiate_encoding('br, zstd') is None
+    assert negotiate_encoding('') is None
+    assert negotiate_encoding(None) is None
+    assert negotiate_encoding('*') == 'gzip'
+
+
+def test_negotiate_respects_quality(all_codecs):
+    assert negotiate_encoding('gzip, br, zstd') == 'zstd'
+    assert negotiate_encoding('gzip, br') == 'br'
+    assert negotiate_encoding('gzip;q=1.0, br;q=0.5') == 'gzip'
+    assert negotiate_encoding('zstd;q=0, gzip;q=0.1') == 'gzip'
+    assert negotiate_encoding('*;q=0.2, br;q=0') == 'zstd'
+    assert negotiate_encoding('identity, gzip;q=0') is None
+    assert negotiate_encoding('gzip;q=bogus') is None
+
+
+def test_gzip_round_trip():
+    data = b'{"a":1}' * 100
+    assert gzip.decompress(compress(data, 'gzip')) == data
+    assert compress(data, None) == data
+
+
+def test_compact_rows_drops_nulls_and_shortens_keys():
+    rows = [{'vendor': 'MSCI', 'region': None, 'notes': '', 'id': 3}]
+    assert compact_rows(rows, {'vendor': 'v', 'id': 'i'}) == [{'v': 'MSCI', 'i': 3}]
+
+
+def test_response_cache_evicts_least_recently_used():
+    cache = ResponseCache(max_entries=2)
+    cache.get_or_create('a', lambda: 1)
+    cache.get_or_create('b', lambda: 2)
+    cache.get_or_create('a', lambda: 'unused')
+    cache.get_or_create('c', lambda: 3)
+    assert cache.get_or_create('a', lambda: 'rebuilt') == 1
+    assert cache.get_or_create('b', lambda: 'rebuilt') == 'rebuilt'
+    cache.invalidate(lambda key: key == 'a')
+    assert cache.get_or_create('a', lambda: 'again') == 'again'
@@ -0,0 +1,50 @@
+import pytest
+from models import parse_cost, parse_rate, split_values
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('127500', (127500.0, 'USD')),
+    ('5937.5', (5937.5, 'USD')),
+    ('$120,000', (120000.0, 'USD')),
+    ('EUR 50k', (50000.0, 'EUR')),
+    ('£1.2m p.a.', (1200000.0, 'GBP')),
+    ('10 million', (10000000.0, 'USD')),
+    ('50,000 CHF per year', (50000.0, 'CHF')),
+])
+def test_parse_cost(text, expected):
+    assert parse_cost(text) == expected
+
+
+@pytest.mark.parametrize('text', [
+    None, '', ' ', 'n.a.', 'TBD',
+    '2024: 50000',          # more than one number
+    '10 to 20k',
+    '50000 plus fees',      # unrecognized words
+    '$50000 EUR',           # conflicting currencies
+])
+def test_parse_cost_rejects_ambiguous_text(text):
+    assert parse_cost(text) == (None, None)
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('0.05', 0.05),
+    ('5%', 0.05),
+    ('5', 0.05),
+    ('1', 0.01),
+    ('1.5', 0.015),
+    ('0.5 %', 0.005),
+    ('CPI', None),
+    (' ', None),
+    (None, None),
+])
+def test_parse_rate(text, expected):
+    result = parse_rate(text)
+    if expected is None:
+        assert result is None
+    else:
+        assert result == pytest.approx(expected)
+
+
+def test_split_values():
+    assert split_values('Pricing, Options,, nan') == ['Pricing', 'Options']
+    assert split_values(None) == []
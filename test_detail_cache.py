@@ -0,0 +1,66 @@
+import io
+import pytest
+
+
+@pytest.fixture
+def product_id(add_product):
+    return add_product(data_ID='bbg_news', short_desc='Bloomberg news', annual_cost='$120,000')
+
+
+def test_detail_page_revalidates_with_etag(client, product_id):
+    res = client.get(f'/dataset/{product_id}')
+    assert res.status_code == 200
+    assert res.headers['Cache-Control'] == 'private, no-cache'
+    assert res.last_modified is not None
+    etag = res.headers['ETag']
+
+    res = client.get(f'/dataset/{product_id}', headers={'If-None-Match': etag})
+    assert res.status_code == 304
+    assert res.data == b''
+
+
+def test_detail_page_cached_per_role(client, admin_client, product_id):
+    import app as app_module
+    public = client.get(f'/dataset/{product_id}')
+    admin = admin_client.get(f'/dataset/{product_id}')
+    assert public.headers['ETag'] != admin.headers['ETag']
+    assert b'$120,000' not in public.data
+    assert b'$120,000' in admin.data
+    assert len(app_module.page_cache._entries) == 2
+
+    # A non-admin revalidating with the admin ETag gets the full public page
+    res = client.get(f'/dataset/{product_id}', headers={'If-None-Match': admin.headers['ETag']})
+    assert res.status_code == 200
+    assert b'$120,000' not in res.data
+
+
+def test_detail_page_changes_after_update(client, admin_client, product_id):
+    etag = client.get(f'/dataset/{product_id}').headers['ETag']
+    assert admin_client.put(f'/api/products/{product_id}', json={'short_desc': 'Renamed feed'}).status_code == 200
+    res = client.get(f'/dataset/{product_id}', headers={'If-None-Match': etag})
+    assert res.status_code == 200
+    assert res.headers['ETag'] != etag
+    assert b'Renamed feed' in res.data
+
+
+def test_detail_page_changes_after_document_upload_and_delete(client, admin_client, product_id):
+    etag = client.get(f'/dataset/{product_id}').headers['ETag']
+    res = admin_client.post(f'/api/dataset/{product_id}/upload',
+                            data={'file': (io.BytesIO(b'terms'), 'terms.pdf')},
+                            content_type='multipart/form-data')
+    assert res.status_code == 200
+    url = res.get_json()['url']
+
+    res = client.get(f'/dataset/{product_id}', headers={'If-None-Match': etag})
+    assert res.status_code == 200
+    assert url.encode() in res.data
+    etag = res.headers['ETag']
+
+    assert admin_client.delete(f'/api/dataset/{product_id}/documents', json={'url': url}).status_code == 200
+    res = client.get(f'/dataset/{product_id}', headers={'If-None-Match': etag})
+    assert res.status_code == 200
+    assert url.encode() not in res.data
+
+
+def test_detail_page_missing_product(client):
+    assert client.get('/dataset/999999').status_code == 404
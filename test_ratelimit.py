@@ -0,0 +1,129 @@
+import pytest
+from ratelimit import TokenBucketStore, AdmissionGate
+
+
+def make_store(tmp_path, capacity=10, refill_rate=2):
+    return TokenBucketStore(str(tmp_path / 'ratelimit.db'), capacity, refill_rate)
+
+
+def test_take_until_empty(tmp_path):
+    store = make_store(tmp_path)
+    for _ in range(2):
+        assert store.take('api:1.2.3.4', 5, now=100.0) == (True, 0)
+    allowed, retry_after = store.take('api:1.2.3.4', 5, now=100.0)
+    assert not allowed
+    assert retry_after == 3  # 5 tokens at 2/sec
+
+
+def test_take_refills_over_time(tmp_path):
+    store = make_store(tmp_path)
+    assert store.take('api:c', 10, now=0.0) == (True, 0)
+    assert store.take('api:c', 1, now=0.0)[0] is False
+    assert store.take('api:c', 2, now=1.0) == (True, 0)
+    # Refill is capped at capacity however long the bucket sat idle
+    assert store.take('api:c', 10, now=1000.0) == (True, 0)
+    assert store.take('api:c', 1, now=1000.0)[0] is False
+
+
+def test_rejected_take_does_not_consume(tmp_path):
+    store = make_store(tmp_path)
+    assert store.take('api:c', 8, now=0.0) == (True, 0)
+    assert store.take('api:c', 5, now=0.0)[0] is False
+    assert store.take('api:c', 2, now=0.0) == (True, 0)
+
+
+def test_keys_are_independent(tmp_path):
+    store = make_store(tmp_path)
+    assert store.take('api:a', 10, now=0.0) == (True, 0)
+    assert store.take('api:b', 10, now=0.0) == (True, 0)
+    assert store.take('typeahead:a', 10, now=0.0) == (True, 0)
+
+
+def test_store_fails_open(tmp_path):
+    store = TokenBucketStore(str(tmp_path / 'missing' / 'ratelimit.db'), 1, 1)
+    assert store.take('api:c', 100, now=0.0) == (True, 0)
+
+
+def test_admission_gate_is_per_client():
+    gate = AdmissionGate(per_client=1, total=3)
+    assert gate.try_enter('a')
+    assert not gate.try_enter('a')
+    assert gate.try_enter('b')
+    gate.leave('a')
+    assert gate.try_enter('a')
+    gate.leave('a')
+    gate.leave('b')
+    assert gate._in_flight == {}
+
+
+def test_admission_gate_caps_the_worker_across_clients():
+    gate = AdmissionGate(per_client=1, total=2)
+    assert gate.try_enter('a')
+    assert gate.try_enter('b')
+    # Both clients are within their own limit, but the worker is full
+    assert not gate.try_enter('c')
+    gate.leave('b')
+    assert gate.try_enter('c')
+    assert not gate.try_enter('b')
+
+
+@pytest.fixture
+def limited(app, monkeypatch, tmp_path):
+    """Rate limiting on, with small fresh buckets"""
+    import app as app_module
+    path = str(tmp_path / 'ratelimit.db')
+    monkeypatch.setitem(app.config, 'RATELIMIT_ENABLED', True)
+    monkeypatch.setitem(app_module.rate_limiters, 'api', TokenBucketStore(path, capacity=10, refill_rate=1))
+    monkeypatch.setitem(app_module.rate_limiters, 'typeahead', TokenBucketStore(path, capacity=3, refill_rate=1))
+    monkeypatch.setattr(app_module, 'heavy_gate', AdmissionGate(per_client=1, total=1))
+    return app_module
+
+
+def test_api_over_budget_gets_json_429(limited, client):
+    assert client.get('/api/products').status_code == 200
+    assert client.get('/api/products').status_code == 200
+    res = client.get('/api/products')
+    assert res.status_code == 429
+    assert res.headers['Retry-After'] == '5'  # heavy costs 5 tokens at 1/sec
+    assert res.get_json() == {'error': 'Rate limit exceeded'}
+    # The rejected request still released its heavy slot
+    assert limited.heavy_gate._running == 0
+
+
+def test_page_over_budget_gets_plain_429(limited, client, add_product):
+    product_id = add_product(data_ID='bbg_news')
+    for _ in range(10):
+        assert client.get(f'/dataset/{product_id}').status_code == 200
+    res = client.get(f'/dataset/{product_id}')
+    assert res.status_code == 429
+    assert res.mimetype == 'text/plain'
+    assert res.headers['Retry-After'] == '1'
+    assert b'Please retry in 1 seconds' in res.data
+
+
+def test_suggest_has_its_own_bucket(limited, client):
+    for _ in range(2):
+        client.get('/api/products')
+    assert client.get('/api/products').status_code == 429
+    for _ in range(3):
+        assert client.get('/api/suggest?field=vendor&prefix=b').status_code == 200
+    assert client.get('/api/suggest?field=vendor&prefix=b').status_code == 429
+
+
+def test_busy_worker_turns_away_heavy_requests(limited, client):
+    assert limited.heavy_gate.try_enter('ip:10.0.0.9')
+    res = client.get('/api/filters')
+    assert res.status_code == 429
+    assert res.headers['Retry-After'] == '1'
+    assert res.get_json() == {'error': 'Too many concurrent requests'}
+    # Light and medium requests still get through
+    assert client.get('/api/column-options').status_code == 200
+    limited.heavy_gate.leave('ip:10.0.0.9')
+    assert client.get('/api/filters').status_code == 200
+    assert limited.heavy_gate._running == 0
+
+
+def test_rate_limiting_can_be_disabled(limited, app, client, monkeypatch):
+    monkeypatch.setitem(app.config, 'RATELIMIT_ENABLED', False)
+    for _ in range(5):
+        assert client.get('/api/products').status_code == 200
@@ -0,0 +1,93 @@
+from types import SimpleNamespace
+from related import SimilarityEngine, tokenize, facet_values
+
+
+def make_products():
+    rows = [
+        (1, 'Bloomberg news sentiment', 'Real-time news sentiment scores', 'Bloomberg', 'GLB', 'Equity', 'News'),
+        (2, 'Ravenpack news analytics', 'News events and sentiment', 'Ravenpack', 'GLB', 'Equity', 'News, Sentiment'),
+        (3, 'MSCI factor model', 'Equity risk factor model', 'MSCI', 'USA', 'Equity', 'Risk'),
+        (4, 'S&P credit ratings', 'Corporate credit ratings history', 'S&P', 'USA', 'Credit', 'Ratings'),
+        (5, 'S&P fundamentals', 'Company fundamentals and ratings', 'S&P', 'GLB', 'Equity, Credit', 'Fundamentals'),
+        (6, 'Commodity news feed', 'Commodity news and sentiment', 'Alexandria', 'GLB', 'Commodity', 'News'),
+    ]
+    return [SimpleNamespace(id=i, short_desc=sd, long_desc=ld, vendor=v, region=r, asset_class=ac, datatype=dt)
+            for i, sd, ld, v, r, ac, dt in rows]
+
+
+def neighbor_ids(engine):
+    return {pid: [rid for rid, _ in nbrs] for pid, nbrs in engine.neighbors.items()}
+
+
+def full_rebuild(products, top_k=3):
+    engine = SimilarityEngine(top_k=top_k)
+    engine.rebuild(products)
+    return engine
+
+
+def test_tokenize_and_facets():
+    assert tokenize('The News, and SENTIMENT data') == ['news', 'sentiment']
+    product = make_products()[1]
+    assert facet_values(product) == {'vendor=ravenpack', 'region=glb', 'asset_class=equity',
+                                     'datatype=news', 'datatype=sentiment'}
+
+
+def test_rebuild_finds_similar_products():
+    engine = full_rebuild(make_products())
+    assert engine.neighbors[1][0][0] == 2
+    assert all(pid != 1 for pid, _ in engine.neighbors[1])
+    assert all(len(nbrs) <= 3 for nbrs in engine.neighbors.values())
+
+
+def test_remove_then_refresh_matches_full_rebuild():
+    products = make_products()
+    engine = full_rebuild(products)
+    expected = neighbor_ids(engine)
+
+    engine.remove(3)
+    assert 3 not in engine.neighbors
+    assert all(3 not in ids for ids in neighbor_ids(engine).values())
+    engine.refresh(products[2])
+    assert neighbor_ids(engine) == expected
+
+
+def test_refresh_of_changed_facets_matches_full_rebuild():
+    products = make_products()
+    engine = full_rebuild(products)
+    # Move product 4 to a region that already exists; vocabularies stay the same
+    products[3].region = 'GLB'
+    products[4].region = 'USA'
+    engine.refresh(products[3])
+    engine.refresh(products[4])
+    assert neighbor_ids(engine) == neighbor_ids(full_rebuild(products))
+
+
+def test_covers_only_seen_terms_and_facets():
+    engine = full_rebuild(make_products())
+    assert all(engine.covers(p) for p in make_products())
+    new_vendor = SimpleNamespace(id=7, short_desc='Bloomberg news', long_desc=None,
+                                 vendor='Refinitiv', region='GLB', asset_class='Equity', datatype='News')
+    new_term = SimpleNamespace(id=7, short_desc='Shipping news', long_desc=None,
+                               vendor='Bloomberg', region='GLB', asset_class='Equity', datatype='News')
+    assert not engine.covers(new_vendor)
+    assert not engine.covers(new_term)
+
+
+def test_new_vendor_products_relate_after_write(add_product, client):
+    add_product(data_ID='a', short_desc='Equity risk factor model', vendor='MSCI', region='USA')
+    add_product(data_ID='b', short_desc='Corporate credit ratings', vendor='S&P', region='USA')
+    first = add_product(data_ID='c', short_desc='Satellite parking lot counts', vendor='Orbital', region='APAC')
+    second = add_product(data_ID='d', short_desc='Satellite parking lot counts', vendor='Orbital', region='APAC')
+    related = client.get(f'/api/products/{first}/related').get_json()
+    assert related[0]['id'] == second
+    assert related[0]['score'] == 1.0
+
+
+def test_delete_product_with_related_rows(add_product, admin_client, client):
+    ids = [add_product(data_ID=f'p{i}', short_desc='News sentiment scores', vendor='Bloomberg')
+           for i in range(3)]
+    assert len(client.get(f'/api/products/{ids[0]}/related').get_json()) == 2
+    res = admin_client.delete(f'/api/products/{ids[0]}')
+    assert res.status_code == 200
+    assert client.get(f'/api/products/{ids[0]}').status_code == 404
+    assert [r['id'] for r in client.get(f'/api/products/{ids[1]}/related').get_json()] == [ids[2]]
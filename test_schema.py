@@ -0,0 +1,27 @@
+from models import db, ensure_schema, get_catalog_version, DataProduct
+
+
+def test_ensure_schema_adds_and_backfills_missing_columns(app):
+    with app.app_context():
+        db.session.execute(db.text('ALTER TABLE data_products DROP COLUMN price_cap_rate'))
+        db.session.execute(db.text("INSERT INTO data_products (data_ID, price_cap) VALUES ('old', '3%')"))
+        db.session.commit()
+        db.engine.dispose()
+
+        ensure_schema()
+        columns = {c['name'] for c in db.inspect(db.engine).get_columns('data_products')}
+        assert 'price_cap_rate' in columns
+        assert DataProduct.query.filter_by(data_ID='old').one().price_cap_rate == 0.03
+
+
+def test_ensure_schema_bumps_version_only_when_backfilling(app):
+    with app.app_context():
+        version = get_catalog_version()
+        ensure_schema()
+        assert get_catalog_version() == version
+
+        db.session.execute(db.text("INSERT INTO data_products (data_ID, region) VALUES ('old', 'USA, GLB')"))
+        db.session.commit()
+        ensure_schema()
+        assert get_catalog_version() == version + 1
+        assert sorted(f.value for f in DataProduct.query.filter_by(data_ID='old').one().facets) == ['GLB', 'USA']
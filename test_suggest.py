@@ -0,0 +1,91 @@
+from types import SimpleNamespace
+from suggest import PrefixIndex, extract_terms
+
+
+def make_product(**fields):
+    defaults = {'data_ID': None, 'short_desc': None, 'vendor': None}
+    defaults.update(fields)
+    return SimpleNamespace(**defaults)
+
+
+def test_extract_terms_splits_and_tokenizes():
+    assert extract_terms('region', 'USA, GLB') == {'USA', 'GLB'}
+    assert extract_terms('short_desc', 'News Sentiment news') == {'news', 'sentiment'}
+    assert extract_terms('data_ID', 'bbg_news') == {'bbg_news'}
+    assert extract_terms('vendor', 'nan') == set()
+
+
+def test_suggest_orders_by_frequency_then_alphabetically():
+    index = PrefixIndex()
+    index.rebuild([
+        make_product(vendor='Bloomberg'),
+        make_product(vendor='Bloomberg'),
+        make_product(vendor='BSE'),
+        make_product(vendor='Barclays'),
+    ], [])
+    assert index.suggest('vendor', 'b') == [('Bloomberg', 2), ('Barclays', 1), ('BSE', 1)]
+    assert index.suggest('vendor', 'bl') == [('Bloomberg', 2)]
+    assert index.suggest('vendor', 'b', limit=1) == [('Bloomberg', 2)]
+    assert index.suggest('vendor', 'z') == []
+
+
+def test_update_terms_adds_and_removes():
+    index = PrefixIndex()
+    product = make_product(vendor='Bloomberg')
+    index.rebuild([product], [])
+    old_terms = PrefixIndex.product_terms(product)
+    product.vendor = 'MSCI'
+    index.update_terms(old_terms, PrefixIndex.product_terms(product))
+    assert index.suggest('vendor', 'b') == []
+    assert index.suggest('vendor', 'm') == [('MSCI', 1)]
+    index.update_terms(PrefixIndex.product_terms(product), {})
+    assert index.suggest('vendor', '') == []
+
+
+def test_options_are_suggested_without_inflating_counts():
+    index = PrefixIndex()
+    options = [SimpleNamespace(column_name='region', value='GLB'),
+               SimpleNamespace(column_name='region', value='EUR')]
+    index.rebuild([make_product(region='GLB'), make_product(region='GLB, USA')], options)
+    assert index.suggest('region', '') == [('GLB', 2), ('USA', 1), ('EUR', 0)]
+
+    # A value used by products survives removal of its option, and vice versa
+    index.remove_option('region', 'GLB')
+    assert ('GLB', 2) in index.suggest('region', 'g')
+    index.remove_option('region', 'EUR')
+    assert index.suggest('region', 'e') == []
+    index.add_option('region', 'ASI')
+    assert index.suggest('region', 'a') == [('ASI', 0)]
+    assert index.has_field('region')
+
+
+def test_apply_only_when_current():
+    index = PrefixIndex()
+    index.rebuild([make_product(vendor='Bloomberg')], [], version=3)
+    add_bse = lambda ix: ix.update_terms({}, {'vendor': {'BSE'}})
+    # Another worker wrote version 4 in between: skip, the next sync rebuilds
+    assert not index.apply(5, add_bse)
+    assert index.version == 3
+    assert index.apply(4, add_bse)
+    assert index.version == 4
+    assert index.suggest('vendor', 'b') == [('Bloomberg', 1), ('BSE', 1)]
+    # Already applied (e.g. a lookup rebuilt first): not applied twice
+    assert not index.apply(4, add_bse)
+    assert index.suggest('vendor', 'bs') == [('BSE', 1)]
+
+
+def test_sync_rebuilds_only_on_version_change():
+    index = PrefixIndex()
+    loads = []
+
+    def load():
+        loads.append(1)
+        return [make_product(vendor='Bloomberg')], []
+
+    index.sync(7, load)
+    index.sync(7, load)
+    assert len(loads) == 1
+    assert index.version == 7
+    index.sync(8, load)
+    assert len(loads) == 2
+    assert index.suggest('vendor', 'b') == [('Bloomberg', 1)]